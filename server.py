@@ -1,31 +1,134 @@
+import codecs
+import hashlib
 import json
+import re
 import sqlite3
 import requests
 import os
-from bs4 import BeautifulSoup
-from flask import Flask, jsonify, request, send_from_directory, g, session, redirect, url_for, render_template_string
+import functools
+import threading
+import time
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from selectolax.lexbor import LexborHTMLParser
+import orjson
+from cachetools import TTLCache
+from flask import Flask, jsonify, request, send_from_directory, session, redirect, url_for, render_template
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
 from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import date
 
+# Serialize API responses (and parse request bodies) with orjson instead of the stdlib json module
+class ORJSONProvider(JSONProvider):
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype="application/json")
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+# Compress responses over 1 KB (wishlist JSON is mostly repeated keys and URLs)
+app.config["COMPRESS_ALGORITHM"] = ["br", "gzip"]
+app.config["COMPRESS_MIN_SIZE"] = 1024
+Compress(app)
 app.secret_key = os.environ.get("SECRET_KEY", "dev-secret-key-change-me")
 DB_FILE = Path("/data/wishlist.db") if Path("/data").exists() else Path("wishlist.db")
 WISHLIST_JSON = Path("wishlist.json")
 ARCHIVE_JSON = Path("archive.json")
 
+# Shared HTTP session so repeated scrapes of the same host reuse keep-alive connections
+SESSION = requests.Session()
+SESSION.headers.update({"User-Agent": "Mozilla/5.0"})
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16, max_retries=Retry(total=2, backoff_factor=0.2))
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+# Scraped metadata is cached in memory and in the url_metadata table for a day
+METADATA_TTL = 86400
+_metadata_cache = TTLCache(maxsize=4096, ttl=METADATA_TTL)
+_metadata_lock = threading.RLock()
+
+# Scrapes run off the request thread; add_item returns before the remote page is fetched
+EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+MAX_PAGE_BYTES = 256 * 1024
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?([\w.:-]+)', re.I)
+_LDJSON_RE = re.compile(rb'<script[^>]+application/ld\+json[^>]*>(.*?)</script>', re.S | re.I)
+
+# One long-lived connection per worker thread instead of reopening the DB file per request
+_tls = threading.local()
+
 def get_db():
-    db = getattr(g, '_database', None)
+    db = getattr(_tls, 'conn', None)
     if db is None:
-        db = g._database = sqlite3.connect(DB_FILE)
+        # Autocommit mode: write endpoints open their own transaction via @writer.
+        # A larger statement cache keeps the hot queries prepared.
+        db = _tls.conn = sqlite3.connect(DB_FILE, cached_statements=256, isolation_level=None)
         db.row_factory = sqlite3.Row  # Return rows as dict-like objects
+        # Per-connection tuning (journal_mode=WAL is persistent and set once in init_db)
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("PRAGMA temp_store=MEMORY")
+        db.execute("PRAGMA mmap_size=268435456")
+        db.execute("PRAGMA cache_size=-65536")
+        db.execute("PRAGMA foreign_keys=ON")
     return db
 
+# Serializes this process's writers; BEGIN IMMEDIATE then takes SQLite's write lock once per request
+_write_lock = threading.Lock()
+
+def writer(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        db = get_db()
+        callbacks = _tls.after_commit = []
+        try:
+            with _write_lock:
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception:
+                    db.execute("ROLLBACK")
+                    raise
+                db.execute("COMMIT")
+        finally:
+            _tls.after_commit = None
+        for callback in callbacks:
+            callback()
+        return result
+    return wrapper
+
+# Admin API guard; sits above @writer so unauthorized requests never take the write lock
+def admin_required(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not session.get('admin_logged_in'):
+            return jsonify({"status": "error", "message": "Unauthorized"}), 403
+        return fn(*args, **kwargs)
+    return wrapper
+
+# Run callback once the current @writer transaction commits (dropped on rollback), or now outside one.
+# Use it for anything other threads could observe, e.g. clearing caches, so they never see pre-commit data.
+def after_commit(callback):
+    callbacks = getattr(_tls, 'after_commit', None)
+    if callbacks is None:
+        callback()
+    else:
+        callbacks.append(callback)
+
 @app.teardown_appcontext
 def close_connection(exception):
-    db = getattr(g, '_database', None)
-    if db is not None:
-        db.close()
+    # Keep the connection open, but never leak a half-finished transaction into the next request
+    db = getattr(_tls, 'conn', None)
+    if db is not None and db.in_transaction:
+        db.rollback()
 
 def init_db():
     with app.app_context():
@@ -34,6 +137,8 @@ def init_db():
             DB_FILE.parent.mkdir(parents=True, exist_ok=True)
             
         db = get_db()
+        # WAL lets readers proceed while a writer commits; the setting sticks to the DB file
+        db.execute("PRAGMA journal_mode=WAL")
         cursor = db.cursor()
         
         # Create users table
@@ -61,41 +166,101 @@ def init_db():
                 FOREIGN KEY (user_id) REFERENCES users (id)
             )
         ''')
+        # Indexes for the per-user list queries and the (user_id, url) lookups.
+        # Collapse any legacy duplicates first (keeping the newest row) so the UNIQUE index can be built.
+        db.execute("BEGIN")
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_items_user_url'")
+        if not cursor.fetchone():
+            cursor.execute('''
+                DELETE FROM items WHERE id NOT IN (
+                    SELECT MAX(id) FROM items GROUP BY user_id, url
+                )
+            ''')
+            if cursor.rowcount:
+                print(f"Removed {cursor.rowcount} duplicate items.")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_user_arch ON items (user_id, archived, id DESC)")
+        cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_items_user_url ON items (user_id, url)")
+        db.commit()
+
+        # Create scraped metadata cache table (shared across users)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS url_metadata (
+                url TEXT PRIMARY KEY,
+                title TEXT,
+                description TEXT,
+                image TEXT,
+                price TEXT,
+                fetched_at INTEGER
+            )
+        ''')
+
         # Migration for 'external_link' column
         try:
             cursor.execute("ALTER TABLE users ADD COLUMN external_link TEXT")
-            db.commit()
             print("Added external_link column to users.")
         except sqlite3.OperationalError:
             pass # Column likely exists
 
+        # Migration for 'item_count' column, kept current by triggers so the admin page needn't aggregate items
+        db.execute("BEGIN")
+        try:
+            cursor.execute("ALTER TABLE users ADD COLUMN item_count INTEGER DEFAULT 0")
+            cursor.execute("UPDATE users SET item_count = (SELECT COUNT(*) FROM items WHERE items.user_id = users.id)")
+            db.commit()
+            print("Added item_count column to users.")
+        except sqlite3.OperationalError:
+            db.rollback() # Column likely exists
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_items_insert_count AFTER INSERT ON items
+            BEGIN
+                UPDATE users SET item_count = item_count + 1 WHERE id = NEW.user_id;
+            END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS trg_items_delete_count AFTER DELETE ON items
+            BEGIN
+                UPDATE users SET item_count = item_count - 1 WHERE id = OLD.user_id;
+            END
+        ''')
+
+        # Migration for 'pending_metadata' column
+        try:
+            cursor.execute("ALTER TABLE items ADD COLUMN pending_metadata BOOLEAN DEFAULT 0")
+            print("Added pending_metadata column to items.")
+        except sqlite3.OperationalError:
+            pass # Column likely exists
+
         # Migration: Check if we have legacy JSON data to import
         # We will import it under a default user "chris" ONLY if DB is empty
         cursor.execute("SELECT count(*) FROM users")
         if cursor.fetchone()[0] == 0:
             print("Migrating legacy data to SQLite...")
+            # One explicit transaction for the user row and both imports
+            db.execute("BEGIN")
             cursor.execute("INSERT INTO users (username) VALUES ('chris')")
             user_id = cursor.lastrowid
+            insert_sql = '''
+                INSERT OR IGNORE INTO items (user_id, url, title, description, image, price, source, added_date, purchased, archived)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            '''
             
             # Migrate Active Wishlist
             if WISHLIST_JSON.exists():
                 try:
                     data = json.loads(WISHLIST_JSON.read_text(encoding="utf-8"))
-                    for item in data:
-                        cursor.execute('''
-                            INSERT INTO items (user_id, url, title, description, image, price, source, added_date, purchased, archived)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
-                        ''', (
-                            user_id, 
-                            item.get('url'), 
-                            item.get('title'), 
-                            item.get('description'), 
-                            item.get('image'), 
-                            item.get('price'), 
-                            item.get('source'), 
-                            item.get('added'), 
-                            1 if item.get('purchased') else 0
-                        ))
+                    rows = [(
+                        user_id, 
+                        item.get('url'), 
+                        item.get('title'), 
+                        item.get('description'), 
+                        item.get('image'), 
+                        item.get('price'), 
+                        item.get('source'), 
+                        item.get('added'), 
+                        1 if item.get('purchased') else 0,
+                        0
+                    ) for item in data]
+                    cursor.executemany(insert_sql, rows)
                 except Exception as e:
                     print(f"Error migrating wishlist.json: {e}")
 
@@ -103,62 +268,78 @@ def init_db():
             if ARCHIVE_JSON.exists():
                 try:
                     data = json.loads(ARCHIVE_JSON.read_text(encoding="utf-8"))
-                    for item in data:
-                        cursor.execute('''
-                            INSERT INTO items (user_id, url, title, description, image, price, source, added_date, purchased, archived)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
-                        ''', (
-                            user_id, 
-                            item.get('url'), 
-                            item.get('title'), 
-                            item.get('description'), 
-                            item.get('image'), 
-                            item.get('price'), 
-                            item.get('source'), 
-                            item.get('added'), 
-                            1 # Archived items are typically purchased, can assume so
-                        ))
+                    rows = [(
+                        user_id, 
+                        item.get('url'), 
+                        item.get('title'), 
+                        item.get('description'), 
+                        item.get('image'), 
+                        item.get('price'), 
+                        item.get('source'), 
+                        item.get('added'), 
+                        1, # Archived items are typically purchased, can assume so
+                        1
+                    ) for item in data]
+                    cursor.executemany(insert_sql, rows)
                 except Exception as e:
                     print(f"Error migrating archive.json: {e}")
             
             db.commit()
             print("Migration complete.")
 
+# Helper to pick the codec for a scraped page: the Content-Type charset, then a <meta> charset
+# declared in the first 1024 bytes (where the HTML Standard stops looking), else UTF-8
+def _page_encoding(body, charset):
+    declared = _META_CHARSET_RE.search(body, 0, 1024)
+    for name in (charset, declared and declared.group(1).decode("ascii")):
+        if name:
+            try:
+                return codecs.lookup(name).name
+            except LookupError:
+                pass
+    return "utf-8"
+
 def fetch_metadata(url):
-    headers = {"User-Agent": "Mozilla/5.0"}
     try:
-        r = requests.get(url, headers=headers, timeout=10)
-        r.raise_for_status()
+        # The tags we need live in <head>; don't download the rest of a multi-MB product page
+        with SESSION.get(url, stream=True, timeout=10) as r:
+            r.raise_for_status()
+            # Only trust an explicit charset; requests otherwise assumes ISO-8859-1 for any text/* page
+            charset = r.encoding if "charset=" in r.headers.get("Content-Type", "").lower() else None
+            body = r.raw.read(MAX_PAGE_BYTES, decode_content=True)
     except Exception as e:
         print(f"Error fetching metadata: {e}")
         return None, None, None, None
 
-    soup = BeautifulSoup(r.text, "html.parser")
+    # Lexbor only needs to build a DOM we query with a handful of CSS selectors
+    encoding = _page_encoding(body, charset)
+    tree = LexborHTMLParser(body.decode(encoding, "replace"))
 
-    def og(name):
-        tag = soup.find("meta", property=f"og:{name}")
-        return tag["content"] if tag else None
+    def meta(selector):
+        tag = tree.css_first(f"meta[{selector}]")
+        return tag.attributes.get("content") if tag else None
 
-    title = og("title") or (soup.title.string.strip() if soup.title else None)
-    description = og("description")
-    image = og("image")
+    title_tag = tree.css_first("title")
+    title = meta('property="og:title"') or (title_tag.text().strip() if title_tag else None)
+    description = meta('property="og:description"')
+    image = meta('property="og:image"')
 
     # Price Scraping
-    price = None
-    
     # 1. Check meta tags
-    price_tag = soup.find("meta", property="product:price:amount") or \
-                soup.find("meta", property="og:price:amount") or \
-                soup.find("meta", itemprop="price")
-    
-    if price_tag and price_tag.get("content"):
-        price = price_tag["content"]
+    price = meta('property="product:price:amount"') or \
+            meta('property="og:price:amount"') or \
+            meta('itemprop="price"')
 
     # 2. Check JSON-LD if no price yet
     if not price:
-        for script in soup.find_all("script", type="application/ld+json"):
+        # Scan the raw bytes rather than walking the DOM for <script> tags
+        for match in _LDJSON_RE.finditer(body):
             try:
-                data = json.loads(script.string)
+                try:
+                    data = orjson.loads(match.group(1))
+                except orjson.JSONDecodeError:
+                    # orjson only takes UTF-8; decode non-UTF-8 pages with their own encoding
+                    data = json.loads(match.group(1).decode(encoding, "replace"))
                 if isinstance(data, dict):
                     # Handle @graph (list of objects)
                     if "@graph" in data:
@@ -180,15 +361,104 @@ def fetch_metadata(url):
 
     return title, description, image, price
 
+# Helper to get cached (title, description, image, price) from memory or the DB; None on a miss
+# Memory entries carry their fetched_at, so a row loaded from the DB expires when the row does
+def get_cached_metadata(url):
+    cutoff = int(time.time()) - METADATA_TTL
+    with _metadata_lock:
+        entry = _metadata_cache.get(url)
+    if entry and entry[1] > cutoff:
+        return entry[0]
+
+    row = get_db().execute(
+        "SELECT title, description, image, price, fetched_at FROM url_metadata WHERE url = ? AND fetched_at > ?",
+        (url, cutoff)
+    ).fetchone()
+    if not row:
+        return None
+
+    meta = tuple(row)[:4]
+    with _metadata_lock:
+        _metadata_cache[url] = (meta, row['fetched_at'])
+    return meta
+
+# Helper to get (title, description, image, price), checking the caches before scraping
+def get_metadata(url):
+    meta = get_cached_metadata(url)
+    if meta:
+        return meta
+
+    meta = fetch_metadata(url)
+    if not any(meta):
+        return meta  # Don't cache failed fetches
+
+    fetched_at = int(time.time())
+    db = get_db()
+    db.execute(
+        "INSERT OR REPLACE INTO url_metadata (url, title, description, image, price, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+        (url, *meta, fetched_at)
+    )
+    with _metadata_lock:
+        _metadata_cache[url] = (meta, fetched_at)
+    return meta
+
+# Background job: scrape metadata for a freshly added item and fill in its row.
+# Runs on an EXECUTOR thread, which gets its own connection from get_db().
+# The row is always taken out of the pending state, even if the scrape fails.
+def _refresh_metadata(item_id, url):
+    title = description = image = price = None
+    try:
+        title, description, image, price = get_metadata(url)
+    except Exception as e:
+        print(f"Error refreshing metadata for {url}: {e}")
+    finally:
+        try:
+            get_db().execute('''
+                UPDATE items SET title = COALESCE(?, title), description = ?, image = ?, price = ?, pending_metadata = 0
+                WHERE id = ?
+            ''', (title, description, image, price, item_id))
+        except Exception as e:
+            print(f"Error saving metadata for {url}: {e}")
+
+# Re-queue scrapes that were lost when the process stopped (e.g. a machine auto-stopped with jobs queued)
+def resume_pending_metadata():
+    rows = get_db().execute("SELECT id, url FROM items WHERE pending_metadata = 1").fetchall()
+    for row in rows:
+        EXECUTOR.submit(_refresh_metadata, row['id'], row['url'])
+
+# The landing page only lists users, so it's rendered once and re-rendered after a user is added or deleted
+_landing_cache = {"version": 0, "html": None, "etag": None}
+_landing_lock = threading.Lock()
+
+def invalidate_landing_cache():
+    with _landing_lock:
+        _landing_cache["version"] += 1
+        _landing_cache["html"] = _landing_cache["etag"] = None
+
 # Initialize DB on startup
 init_db()
+resume_pending_metadata()
 
 @app.route("/")
 def index():
-    db = get_db()
-    users = db.execute("SELECT username FROM users ORDER BY username COLLATE NOCASE ASC").fetchall()
-    users_list = [dict(row) for row in users]
-    return render_template_string(open("landing.html").read(), users=users_list)
+    with _landing_lock:
+        version, html, etag = _landing_cache["version"], _landing_cache["html"], _landing_cache["etag"]
+
+    if html is None:
+        db = get_db()
+        users = db.execute("SELECT username FROM users ORDER BY username COLLATE NOCASE ASC").fetchall()
+        users_list = [dict(row) for row in users]
+        html = render_template("landing.html", users=users_list)
+        # Content hash, so the ETag stays valid across restarts and workers
+        etag = hashlib.md5(html.encode("utf-8")).hexdigest()
+        with _landing_lock:
+            # Don't store a render that raced with a user add/delete
+            if _landing_cache["version"] == version:
+                _landing_cache.update(html=html, etag=etag)
+
+    response = app.response_class(html, mimetype="text/html")
+    response.set_etag(etag)
+    return response.make_conditional(request)
 
 @app.route("/admin", methods=["GET", "POST"])
 def admin_page():
@@ -200,29 +470,22 @@ def admin_page():
             session['admin_logged_in'] = True
             return redirect(url_for('admin_page'))
         else:
-            return render_template_string(open("admin.html").read(), error="Invalid Password")
+            return render_template("admin.html", error="Invalid Password")
 
     if not session.get('admin_logged_in'):
-        return render_template_string(open("admin.html").read())
+        return render_template("admin.html")
 
     # Logged In: Show Dashboard
     db = get_db()
-    users = db.execute('''
-        SELECT u.username, COUNT(i.id) as item_count 
-        FROM users u 
-        LEFT JOIN items i ON u.id = i.user_id 
-        GROUP BY u.id
-        ORDER BY u.username COLLATE NOCASE ASC
-    ''').fetchall()
+    users = db.execute("SELECT username, item_count FROM users ORDER BY username COLLATE NOCASE ASC").fetchall()
     
     users_list = [dict(row) for row in users]
-    return render_template_string(open("admin.html").read(), users=users_list, logged_in=True)
+    return render_template("admin.html", users=users_list, logged_in=True)
 
 @app.route("/api/admin/delete_user", methods=["POST"])
+@admin_required
+@writer
 def admin_delete_user():
-    if not session.get('admin_logged_in'):
-        return jsonify({"status": "error", "message": "Unauthorized"}), 403
-        
     data = request.get_json()
     username = data.get("username")
     
@@ -239,7 +502,8 @@ def admin_delete_user():
     # Cascade delete
     db.execute("DELETE FROM items WHERE user_id = ?", (user_id,))
     db.execute("DELETE FROM users WHERE id = ?", (user_id,))
-    db.commit()
+    after_commit(_user_id.cache_clear)
+    after_commit(invalidate_landing_cache)
     
     return jsonify({"status": "deleted"})
 
@@ -262,27 +526,33 @@ def user_wishlist(username):
     base_dir = Path(__file__).parent.resolve()
     return send_from_directory(base_dir, "index.html")
 
+# Users change rarely, so cache username -> id lookups. Unknown users raise instead of
+# returning None so misses aren't cached. Cleared by the admin add/delete endpoints.
+@functools.lru_cache(maxsize=2048)
+def _user_id(username):
+    row = get_db().execute("SELECT id FROM users WHERE username = ?", (username,)).fetchone()
+    if not row:
+        raise KeyError(username)
+    return row['id']
+
 # Helper to get user_id (create if not exists by default)
 def get_user_id(username, create=True):
-    db = get_db()
-    cur = db.execute("SELECT id FROM users WHERE username = ?", (username,))
-    row = cur.fetchone()
-    if row:
-        return row['id']
+    try:
+        return _user_id(username)
+    except KeyError:
+        pass
     
     if not create:
         return None
 
     # Create user
-    cur = db.execute("INSERT INTO users (username) VALUES (?)", (username,))
-    db.commit()
+    cur = get_db().execute("INSERT INTO users (username) VALUES (?)", (username,))
+    after_commit(invalidate_landing_cache)
     return cur.lastrowid
 
 @app.route("/api/admin/add_user", methods=["POST"])
+@admin_required
 def admin_add_user():
-    if not session.get('admin_logged_in'):
-        return jsonify({"status": "error", "message": "Unauthorized"}), 403
-        
     data = request.get_json()
     username = data.get("username")
     
@@ -291,38 +561,46 @@ def admin_add_user():
 
     # Create user if not exists
     get_user_id(username, create=True)
+    after_commit(_user_id.cache_clear)
     
     return jsonify({"status": "added", "username": username})
 
+# Column order of the item list queries below. Zipping plain tuples with these is cheaper than sqlite3.Row -> dict
+ITEM_KEYS = ("url", "title", "description", "image", "price", "source", "added", "purchased")
+WISHLIST_KEYS = ITEM_KEYS + ("pending",)
+
 @app.route("/api/<username>/wishlist")
 def get_wishlist(username):
     user_id = get_user_id(username)
-    db = get_db()
-    cur = db.execute('''
-        SELECT url, title, description, image, price, source, added_date as added, purchased 
+    cur = get_db().cursor()
+    cur.row_factory = None
+    cur.execute('''
+        SELECT url, title, description, image, price, source, added_date as added, purchased, pending_metadata as pending 
         FROM items 
         WHERE user_id = ? AND archived = 0 
         ORDER BY id DESC
     ''', (user_id,))
     
-    items = [dict(row) for row in cur.fetchall()]
+    items = [dict(zip(WISHLIST_KEYS, row)) for row in cur.fetchall()]
     return jsonify(items)
 
 @app.route("/api/<username>/archive")
 def get_archive_items(username):
     user_id = get_user_id(username)
-    db = get_db()
-    cur = db.execute('''
+    cur = get_db().cursor()
+    cur.row_factory = None
+    cur.execute('''
         SELECT url, title, description, image, price, source, added_date as added, purchased 
         FROM items 
         WHERE user_id = ? AND archived = 1 
         ORDER BY id DESC
     ''', (user_id,))
     
-    items = [dict(row) for row in cur.fetchall()]
+    items = [dict(zip(ITEM_KEYS, row)) for row in cur.fetchall()]
     return jsonify(items)
 
 @app.route("/api/<username>/add", methods=["POST"])
+@writer
 def add_item(username):
     data = request.get_json()
     url = data.get("url")
@@ -332,28 +610,23 @@ def add_item(username):
     user_id = get_user_id(username)
     db = get_db()
     
-    # Check duplicate or archived
-    cur = db.execute("SELECT id, archived FROM items WHERE user_id = ? AND url = ?", (user_id, url))
-    row = cur.fetchone()
-    
-    if row:
-        if row['archived']:
-            # Restore it
-            db.execute("UPDATE items SET archived = 0, purchased = 0, added_date = ? WHERE id = ?", (date.today().isoformat(), row['id']))
-            db.commit()
-            # Fetch metadata again? No, assume it's fine. Or maybe update it? Let's just restore.
-            # Actually, return title so frontend can say "Restored X"
-            cur = db.execute("SELECT title FROM items WHERE id = ?", (row['id'],))
-            title = cur.fetchone()['title']
-            return jsonify({"status": "restored", "title": title})
-        else:
-            return jsonify({"status": "exists"}), 200
-
-    title, description, image, price = fetch_metadata(url)
-    
-    db.execute('''
-        INSERT INTO items (user_id, url, title, description, image, price, source, added_date, purchased, archived)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, 0)
+    # Metadata never comes from the network here, so there's no need to check for an existing row first
+    meta = get_cached_metadata(url)
+    if meta:
+        title, description, image, price = meta
+        pending = 0
+    else:
+        # Use the URL as a placeholder title until the background scrape fills the row in
+        title, description, image, price = url, None, None, None
+        pending = 1
+    today = date.today().isoformat()
+
+    # The UNIQUE (user_id, url) index turns the duplicate check into the insert itself
+    cur = db.execute('''
+        INSERT INTO items (user_id, url, title, description, image, price, source, added_date, purchased, archived, pending_metadata)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, 0, ?)
+        ON CONFLICT (user_id, url) DO NOTHING
+        RETURNING id
     ''', (
         user_id,
         url,
@@ -362,13 +635,28 @@ def add_item(username):
         image,
         price,
         urlparse(url).netloc,
-        date.today().isoformat()
+        today,
+        pending
     ))
-    db.commit()
-
-    return jsonify({"status": "added", "title": title})
+    # RETURNING rows are read with fetchall() so the statement has finished by COMMIT
+    rows = cur.fetchall()
+    if rows:
+        if pending:
+            # Queue the scrape once the row is committed, so the job never waits on our write lock
+            after_commit(functools.partial(EXECUTOR.submit, _refresh_metadata, rows[0]['id'], url))
+        return jsonify({"status": "added", "title": title})
+
+    # Already there: restore it if archived, keeping the stored metadata
+    rows = db.execute(
+        "UPDATE items SET archived = 0, purchased = 0, added_date = ? WHERE user_id = ? AND url = ? AND archived = 1 RETURNING title",
+        (today, user_id, url)
+    ).fetchall()
+    if rows:
+        return jsonify({"status": "restored", "title": rows[0]['title']})
+    return jsonify({"status": "exists"}), 200
 
 @app.route("/api/<username>/delete", methods=["POST"])
+@writer
 def delete_item(username):
     data = request.get_json()
     url_to_delete = data.get("url")
@@ -376,58 +664,101 @@ def delete_item(username):
     
     db = get_db()
     db.execute("DELETE FROM items WHERE user_id = ? AND url = ?", (user_id, url_to_delete))
-    db.commit()
     
     return jsonify({"status": "deleted"})
 
 @app.route("/api/<username>/mark_purchased", methods=["POST"])
+@writer
 def mark_purchased(username):
     data = request.get_json()
     url = data.get("url")
     user_id = get_user_id(username)
     
     db = get_db()
-    db.execute("UPDATE items SET purchased = 1 WHERE user_id = ? AND url = ?", (user_id, url))
-    db.commit()
+    rows = db.execute("UPDATE items SET purchased = 1 WHERE user_id = ? AND url = ? RETURNING id", (user_id, url)).fetchall()
+    if not rows:
+        return jsonify({"status": "not_found"}), 404
     return jsonify({"status": "marked"})
 
 @app.route("/api/<username>/unmark_purchased", methods=["POST"])
+@writer
 def unmark_purchased(username):
     data = request.get_json()
     url = data.get("url")
     user_id = get_user_id(username)
     
     db = get_db()
-    db.execute("UPDATE items SET purchased = 0 WHERE user_id = ? AND url = ?", (user_id, url))
-    db.commit()
+    rows = db.execute("UPDATE items SET purchased = 0 WHERE user_id = ? AND url = ? RETURNING id", (user_id, url)).fetchall()
+    if not rows:
+        return jsonify({"status": "not_found"}), 404
     return jsonify({"status": "unmarked"})
 
+# SQLite caps bound parameters per statement, so bulk IN (...) lists are split into chunks
+BULK_CHUNK_SIZE = 500
+
+def _bulk_execute(user_id, urls, sql):
+    db = get_db()
+    count = 0
+    for i in range(0, len(urls), BULK_CHUNK_SIZE):
+        chunk = urls[i:i + BULK_CHUNK_SIZE]
+        cur = db.execute(sql.format(placeholders=",".join("?" * len(chunk))), (user_id, *chunk))
+        count += cur.rowcount
+    return count
+
+@app.route("/api/<username>/bulk_mark", methods=["POST"])
+@writer
+def bulk_mark_purchased(username):
+    data = request.get_json()
+    urls = data.get("urls")
+    if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+        return jsonify({"status": "error", "message": "URLs must be a list of strings"}), 400
+    user_id = get_user_id(username)
+
+    count = _bulk_execute(user_id, urls, "UPDATE items SET purchased = 1 WHERE user_id = ? AND url IN ({placeholders})")
+    return jsonify({"status": "marked", "count": count})
+
+@app.route("/api/<username>/bulk_delete", methods=["POST"])
+@writer
+def bulk_delete_items(username):
+    data = request.get_json()
+    urls = data.get("urls")
+    if not isinstance(urls, list) or not all(isinstance(url, str) for url in urls):
+        return jsonify({"status": "error", "message": "URLs must be a list of strings"}), 400
+    user_id = get_user_id(username)
+
+    count = _bulk_execute(user_id, urls, "DELETE FROM items WHERE user_id = ? AND url IN ({placeholders})")
+    return jsonify({"status": "deleted", "count": count})
+
 @app.route("/api/<username>/archive_purchased", methods=["POST"])
+@writer
 def archive_purchased(username):
     user_id = get_user_id(username)
     db = get_db()
     
     result = db.execute("UPDATE items SET archived = 1 WHERE user_id = ? AND purchased = 1 AND archived = 0", (user_id,))
-    db.commit()
     
     return jsonify({"status": "archived", "count": result.rowcount})
 
 @app.route("/api/<username>/restore", methods=["POST"])
+@writer
 def restore_item(username):
     data = request.get_json()
     url = data.get("url")
     user_id = get_user_id(username)
     
     db = get_db()
-    
-    # Check if active list already has this URL (deduplication)
-    cur = db.execute("SELECT id FROM items WHERE user_id = ? AND url = ? AND archived = 0", (user_id, url))
+    rows = db.execute(
+        "UPDATE items SET archived = 0, purchased = 0 WHERE user_id = ? AND url = ? AND archived = 1 RETURNING id",
+        (user_id, url)
+    ).fetchall()
+    if rows:
+        return jsonify({"status": "restored"})
+
+    # Nothing restored: tell an already-active item (deduplication) apart from a missing one
+    cur = db.execute("SELECT id FROM items WHERE user_id = ? AND url = ?", (user_id, url))
     if cur.fetchone():
         return jsonify({"status": "exists_active"}), 400
-
-    db.execute("UPDATE items SET archived = 0, purchased = 0 WHERE user_id = ? AND url = ?", (user_id, url))
-    db.commit()
-    return jsonify({"status": "restored"})
+    return jsonify({"status": "not_found"}), 404
 
 @app.route("/api/<username>/info")
 def get_user_info(username):
@@ -440,6 +771,7 @@ def get_user_info(username):
     return jsonify({"external_link": row['external_link']})
 
 @app.route("/api/<username>/set_link", methods=["POST"])
+@writer
 def set_external_link(username):
     data = request.get_json()
     link = data.get("link")
@@ -447,7 +779,6 @@ def set_external_link(username):
     
     db = get_db()
     db.execute("UPDATE users SET external_link = ? WHERE id = ?", (link, user_id))
-    db.commit()
     return jsonify({"status": "updated", "link": link})
 
 if __name__ == "__main__":